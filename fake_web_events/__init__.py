@@ -1 +1,9 @@
-from fake_web_events.simulation import Simulation
+def __getattr__(name):
+    # Simulation pulls in Faker, which is slow to import, so only load it when it is first used
+    if name == 'Simulation':
+        from fake_web_events.simulation import Simulation
+        return Simulation
+    raise AttributeError(f"module 'fake_web_events' has no attribute '{name}'")
+
+
+__all__ = ['Simulation']
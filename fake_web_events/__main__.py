@@ -0,0 +1,3 @@
+from fake_web_events.cli import main
+
+main()
@@ -0,0 +1,252 @@
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import multiprocessing
+import os
+import random
+import sys
+from datetime import datetime
+from queue import Empty
+from time import time
+
+from faker import Faker
+
+from fake_web_events.event_log import EventLogWriter
+from fake_web_events.simulation import Simulation
+from fake_web_events.utils import get_memory_usage
+
+from typing import BinaryIO, Iterator, List, Optional
+
+BATCH_SIZE = 1000
+COMPRESSORS = {'gzip': gzip.open, 'bz2': bz2.open, 'lzma': lzma.open}
+
+
+class QueueWriter:
+    """
+    File-like object sending written chunks to a queue, so workers can share the same output
+    """
+
+    def __init__(self, queue: multiprocessing.Queue):
+        self.queue = queue
+
+    def write(self, data: bytes) -> None:
+        self.queue.put(data)
+
+    def close(self) -> None:
+        self.queue.put(None)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='fake-web-events',
+        description='Generate fake web events. By default, events are written to stdout as newline delimited JSON.'
+    )
+    parser.add_argument('--user-pool-size', type=int, default=100, help='number of users in the pool (default: 100)')
+    parser.add_argument('--sessions-per-day', type=int, default=10000, help='rate of new sessions (default: 10000)')
+    parser.add_argument('--batch-size', type=int, default=10, help='simulated seconds per step (default: 10)')
+    parser.add_argument('--seed', type=int, help='random seed, for reproducible events')
+    parser.add_argument('--start', type=datetime.fromisoformat, default=datetime.now(),
+                        help='simulated start time, e.g. 2020-07-07T00:00:00 (default: now)')
+    parser.add_argument('--end', type=datetime.fromisoformat, help='stop when the simulated time reaches this time')
+    parser.add_argument('--duration', type=float, default=float('inf'),
+                        help='stop after this many real seconds (default: run until --end or forever)')
+    parser.add_argument('--max-sessions', type=int,
+                        help='maximum number of concurrent sessions, split between workers')
+    parser.add_argument('--admission-policy', choices=Simulation.admission_policies, default='reject_new',
+                        help='what to do with new sessions when --max-sessions is reached (default: reject_new)')
+    parser.add_argument('--new-user-probability', type=float, default=0,
+                        help='probability that a new session belongs to a new user (default: 0, fixed user pool)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes generating events, each with its own share of users and sessions')
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file, or - for stdout (default). "
+                             "With several workers, use {worker} in the file name to write one file per worker")
+    parser.add_argument('--format', choices=['ndjson', 'binary'], default='ndjson', help='output format (default: ndjson)')
+    parser.add_argument('--compression', choices=['none'] + list(COMPRESSORS), default='none',
+                        help='output compression (default: none)')
+    parser.add_argument('--bench', action='store_true', help='print throughput and memory statistics to stderr')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.max_sessions is not None and args.max_sessions < 1:
+        parser.error('--max-sessions must be at least 1')
+    if args.workers > 1 and args.output != '-' and '{worker}' not in args.output:
+        parser.error('--output must contain {worker} when using several workers')
+    if args.workers > 1 and args.output == '-' and args.format == 'binary':
+        parser.error('binary format can only be written to stdout with a single worker')
+    return args
+
+
+def open_output(path: str, compression: str) -> BinaryIO:
+    """
+    Open a file (or stdout if path is -) for writing, with the given compression
+    """
+    file = sys.stdout.buffer if path == '-' else path
+    if compression != 'none':
+        return COMPRESSORS[compression](file, 'wb')
+    return file if path == '-' else open(file, 'wb')
+
+
+def close_output(output: BinaryIO) -> None:
+    """
+    Close the output, but only flush stdout
+    """
+    if output is sys.stdout.buffer:
+        output.flush()
+    else:
+        output.close()
+
+
+def generate_events(args: argparse.Namespace, worker: int) -> Iterator[dict]:
+    """
+    Run the simulation of one worker, which gets its share of the users and sessions
+    """
+    if args.seed is not None:
+        random.seed(args.seed + worker)
+        Faker.seed(args.seed + worker)
+
+    simulation = Simulation(
+        user_pool_size=max(1, args.user_pool_size // args.workers),
+        sessions_per_day=args.sessions_per_day / args.workers,
+        batch_size=args.batch_size,
+        init_time=args.start,
+        max_sessions=None if args.max_sessions is None else max(1, args.max_sessions // args.workers),
+        admission_policy=args.admission_policy,
+        new_user_probability=args.new_user_probability,
+    )
+    return simulation.run(args.duration, until=args.end)
+
+
+def write_events(args: argparse.Namespace, worker: int, output: BinaryIO) -> int:
+    """
+    Write the events of one worker to the output, returning the quantity of events written.
+    NDJSON lines are written in batches, so each write holds whole lines only.
+    """
+    qty_events = 0
+    if args.format == 'binary':
+        with EventLogWriter(output) as writer:
+            for event in generate_events(args, worker):
+                writer.write(event)
+                qty_events += 1
+        return qty_events
+
+    lines = []
+    for event in generate_events(args, worker):
+        lines.append(json.dumps(event, ensure_ascii=False))
+        if len(lines) == BATCH_SIZE:
+            output.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            qty_events += len(lines)
+            lines = []
+    if lines:
+        output.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        qty_events += len(lines)
+    return qty_events
+
+
+def run_worker(args: argparse.Namespace, worker: int, chunks: multiprocessing.Queue,
+               stats: multiprocessing.Queue) -> None:
+    """
+    Write the events of one worker either to its own file, or to the queue of chunks when writing to stdout.
+    The end of the output and the stats are always sent, even if the worker fails, so the parent never waits forever.
+    """
+    qty_events = 0
+    output = QueueWriter(chunks) if args.output == '-' else None
+    try:
+        if output is None:
+            output = open_output(args.output.format(worker=worker), args.compression)
+        qty_events = write_events(args, worker, output)
+    finally:
+        if output is not None:
+            output.close()
+        stats.put((qty_events, get_memory_usage()))
+
+
+def get_from_workers(queue: multiprocessing.Queue, workers: List[multiprocessing.Process]):
+    """
+    Get an item from a queue fed by the workers, giving up once all workers have stopped without sending it
+    """
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if not any(worker.is_alive() for worker in workers):
+                raise RuntimeError('workers stopped unexpectedly')
+
+
+def run_workers(args: argparse.Namespace) -> List[tuple]:
+    """
+    Start one process per worker. When writing to stdout, chunks of events from all workers are written here.
+    If writing fails (e.g. the reader of stdout went away), the workers are terminated instead of being left
+    blocked on the queue. Raises RuntimeError if any worker failed.
+    """
+    chunks = multiprocessing.Queue(maxsize=args.workers * 4)
+    stats = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_worker, args=(args, worker, chunks, stats), daemon=True)
+               for worker in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        if args.output == '-':
+            output = open_output(args.output, args.compression)
+            running = args.workers
+            while running:
+                chunk = get_from_workers(chunks, workers)
+                if chunk is None:
+                    running -= 1
+                else:
+                    output.write(chunk)
+            close_output(output)
+
+        results = [get_from_workers(stats, workers) for _ in workers]
+    except BaseException:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+
+    failed = [worker for worker in workers if worker.exitcode != 0]
+    if failed:
+        raise RuntimeError(f'{len(failed)} of {len(workers)} workers failed')
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    start = time()
+
+    try:
+        if args.workers == 1:
+            output = open_output(args.output.format(worker=0), args.compression)
+            qty_events = write_events(args, 0, output)
+            close_output(output)
+            results = [(qty_events, get_memory_usage())]
+        else:
+            results = run_workers(args)
+    except BrokenPipeError:
+        # the reader of stdout went away (e.g. piped into head), stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    except RuntimeError as error:
+        print(f'fake-web-events: error: {error}', file=sys.stderr)
+        sys.exit(1)
+
+    if args.bench:
+        elapsed = time() - start
+        qty_events = sum(qty for qty, _ in results)
+        max_memory = max(memory for _, memory in results)
+        print(f'Events: {qty_events}\n'
+              f'Elapsed: {elapsed:.2f} seconds\n'
+              f'Throughput: {qty_events / elapsed:.0f} events/second\n'
+              f'Workers: {args.workers}\n'
+              f'Memory usage: {max_memory / 2 ** 20:.1f} MB per worker', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 from faker import Faker
-from fake_web_events.utils import WeightedRandom
+from fake_web_events.utils import WeightedRandom, Samplers
 from fake_web_events.user import User
 import json
 import random
@@ -11,8 +11,10 @@ class Event(Faker, WeightedRandom):
     Creates events and keeps tracks of sessions
     """
 
-    def __init__(self, current_timestamp: datetime, user: User, batch_size: int):
+    def __init__(self, current_timestamp: datetime, user: User, batch_size: int, samplers: Samplers = None):
         super().__init__(['en_US'])
+        if samplers is not None:
+            self.samplers = samplers
         self.previous_page = None
         self.current_page = self.select('landing_pages')
         self.user = user
@@ -32,8 +34,7 @@ class Event(Faker, WeightedRandom):
         """
         Calculate which one should be the next page
         """
-        pages, weights = self.get_pages(self.current_page)
-        self.current_page = random.choices(pages, weights=weights)[0]
+        self.current_page = self.samplers.next_page(self.current_page)
 
         return self.current_page
 
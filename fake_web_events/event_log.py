@@ -0,0 +1,189 @@
+import json
+import struct
+import uuid
+from datetime import datetime, timedelta
+
+from typing import BinaryIO, Dict, Iterator
+
+MAGIC = b'FWEVLOG1'
+HEADER = struct.Struct('<8sI4x')
+FOOTER = struct.Struct('<Q8s')
+RECORD = struct.Struct('<q16sIHBx')
+EPOCH = datetime(1970, 1, 1)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+EVENT_FIELDS = ('event_id', 'event_timestamp', 'event_type', 'page_url', 'page_url_path')
+CATEGORICAL_USER_FIELDS = (
+    'referer_url', 'referer_url_scheme', 'referer_url_port', 'referer_medium',
+    'utm_medium', 'utm_source', 'utm_content', 'utm_campaign',
+    'geo_country', 'geo_timezone',
+    'browser_name', 'browser_language',
+    'os_name', 'os_timezone',
+    'device_type',
+)
+
+
+class EventLogWriter:
+    """
+    Write events to a compact binary log with one fixed-width record per event.
+
+    The file starts with a small header, followed by the records and ends with a JSON trailer holding the
+    vocabularies and the user pool table. Pages and event types are stored in the records as codes into a
+    vocabulary, and users as an index into the user pool table, where categorical attributes (browser, OS,
+    UTM, device...) are themselves codes into a vocabulary. The trailer is written last, so the log can be
+    written to non seekable streams.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.fields = None
+        self.vocabularies = {field: {} for field in ('page', 'event_type') + CATEGORICAL_USER_FIELDS}
+        self.users = {}
+        self.user_codes = {field: [] for field in CATEGORICAL_USER_FIELDS}
+        self.user_values = {}
+        self.qty_events = 0
+        self.file.write(HEADER.pack(MAGIC, RECORD.size))
+
+    def __enter__(self) -> 'EventLogWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def encode(self, field: str, value) -> int:
+        """
+        Get the code of a value in the vocabulary of a field, adding it if it is new
+        """
+        vocabulary = self.vocabularies[field]
+        code = vocabulary.get(value)
+        if code is None:
+            code = vocabulary[value] = len(vocabulary)
+        return code
+
+    def get_user_index(self, event: dict) -> int:
+        """
+        Get the index of the event's user in the user pool table, adding the user if it is new
+        """
+        user_index = self.users.get(event['user_domain_id'])
+        if user_index is None:
+            user_index = self.users[event['user_domain_id']] = len(self.users)
+            for field in self.fields:
+                if field in CATEGORICAL_USER_FIELDS:
+                    self.user_codes[field].append(self.encode(field, event[field]))
+                elif field not in EVENT_FIELDS:
+                    self.user_values.setdefault(field, []).append(event[field])
+        return user_index
+
+    def write(self, event: dict) -> None:
+        """
+        Write one event as a fixed-width record
+        """
+        if self.fields is None:
+            self.fields = list(event.keys())
+
+        timestamp = datetime.fromisoformat(event['event_timestamp']) - EPOCH
+        self.file.write(RECORD.pack(
+            timestamp // timedelta(microseconds=1),
+            uuid.UUID(event['event_id']).bytes,
+            self.get_user_index(event),
+            self.encode('page', (event['page_url'], event['page_url_path'])),
+            self.encode('event_type', event['event_type']),
+        ))
+        self.qty_events += 1
+
+    def close(self) -> None:
+        """
+        Write the trailer with vocabularies and user pool table
+        """
+        trailer = json.dumps({
+            'fields': self.fields or [],
+            'vocabularies': {field: list(vocabulary) for field, vocabulary in self.vocabularies.items()},
+            'user_codes': self.user_codes,
+            'user_values': self.user_values,
+        }, ensure_ascii=False).encode('utf-8')
+        self.file.write(trailer)
+        self.file.write(FOOTER.pack(len(trailer), MAGIC))
+        self.file.flush()
+
+
+class EventLog:
+    """
+    Read a binary event log written by EventLogWriter.
+
+    Records are memory mapped as a NumPy structured array with the fields event_timestamp (microseconds since
+    epoch), event_id (16 bytes UUID), user (index into the user pool table), page and event_type (codes into
+    vocabularies). Nothing is decoded until asked for, so large logs can be replayed at memory speed.
+    Requires numpy.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        with open(path, 'rb') as f:
+            magic, record_size = HEADER.unpack(f.read(HEADER.size))
+            f.seek(-FOOTER.size, 2)
+            trailer_size, footer_magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC or footer_magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f'{path} is not a fake web events log')
+            trailer_offset = f.tell() - FOOTER.size - trailer_size
+            f.seek(trailer_offset)
+            trailer = json.loads(f.read(trailer_size).decode('utf-8'))
+
+        self.fields = trailer['fields']
+        self.vocabularies = trailer['vocabularies']
+        self.user_codes = {field: np.array(codes, dtype='<u4') for field, codes in trailer['user_codes'].items()}
+        self.user_values = trailer['user_values']
+        self.dtype = np.dtype({
+            'names': ['event_timestamp', 'event_id', 'user', 'page', 'event_type'],
+            'formats': ['<i8', 'V16', '<u4', '<u2', 'u1'],
+            'offsets': [0, 8, 24, 28, 30],
+            'itemsize': RECORD.size,
+        })
+        qty_records = (trailer_offset - HEADER.size) // RECORD.size
+        if qty_records > 0:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER.size, shape=(qty_records,))
+        else:
+            self.records = np.empty(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, idx: int) -> dict:
+        return self.decode(self.records[idx])
+
+    def __iter__(self) -> Iterator[dict]:
+        for record in self.records:
+            yield self.decode(record)
+
+    def codes(self, field: str):
+        """
+        Get an array with the code of a categorical field for every event, e.g. codes('browser_name').
+        Codes can be translated with the field's vocabulary.
+        """
+        if field in ('page', 'event_type'):
+            return self.records[field]
+        return self.user_codes[field][self.records['user']]
+
+    def get_user(self, user_index: int) -> Dict[str, object]:
+        """
+        Decode the attributes of a user from the user pool table
+        """
+        user = {field: self.vocabularies[field][codes[user_index]] for field, codes in self.user_codes.items()}
+        user.update({field: values[user_index] for field, values in self.user_values.items()})
+        return user
+
+    def decode(self, record) -> dict:
+        """
+        Decode a record into the same dictionary yielded by the simulation
+        """
+        page_url, page_url_path = self.vocabularies['page'][record['page']]
+        timestamp = EPOCH + timedelta(microseconds=int(record['event_timestamp']))
+        event = {
+            'event_id': str(uuid.UUID(bytes=bytes(record['event_id']))),
+            'event_timestamp': timestamp.strftime(TIMESTAMP_FORMAT),
+            'event_type': self.vocabularies['event_type'][record['event_type']],
+            'page_url': page_url,
+            'page_url_path': page_url_path,
+            **self.get_user(int(record['user'])),
+        }
+        return {field: event[field] for field in self.fields}
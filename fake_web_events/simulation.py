@@ -1,27 +1,53 @@
 from datetime import datetime, timedelta
 from random import randrange, choices
 from fake_web_events.event import Event
-from fake_web_events.user import UserPool
-from fake_web_events.utils import load_config
+from fake_web_events.user import UserPool, StreamingUserPool
+from fake_web_events.utils import LazyConfig, Samplers, WeightedRandom, get_memory_usage, get_partition, load_config, \
+    validate_config
 from time import time
+import logging
 
-from typing import Generator
+from typing import Generator, Sequence
 
 
 class Simulation:
     """
     Keep track of the simulation state
     """
-    config = load_config()
+    config = LazyConfig()
+    admission_policies = ('reject_new', 'end_oldest')
 
     def __init__(
             self,
             user_pool_size: int,
             sessions_per_day: int = 10000,
             batch_size: int = 10,
-            init_time: datetime = datetime.now()):
-
-        self.user_pool = UserPool(size=user_pool_size)
+            init_time: datetime = datetime.now(),
+            watch_config: bool = False,
+            max_sessions: int = None,
+            admission_policy: str = 'reject_new',
+            new_user_probability: float = 0):
+
+        if admission_policy not in self.admission_policies:
+            raise ValueError(f'admission_policy must be one of {self.admission_policies}, got {admission_policy}')
+        if max_sessions is not None and max_sessions < 1:
+            raise ValueError(f'max_sessions must be at least 1, got {max_sessions}')
+
+        self.samplers = WeightedRandom.samplers
+        self.config = self.samplers.config
+        self.next_samplers = self.samplers
+        self.file_config = self.samplers.config
+        self.config_error = None
+        self.watch_config = watch_config
+        if new_user_probability > 0:
+            self.user_pool = StreamingUserPool(size=user_pool_size, new_user_probability=new_user_probability,
+                                               samplers=self.samplers)
+        else:
+            self.user_pool = UserPool(size=user_pool_size, samplers=self.samplers)
+        self.max_sessions = max_sessions
+        self.admission_policy = admission_policy
+        self.qty_rejected_sessions = 0
+        self.qty_evicted_sessions = 0
         self.cur_sessions = []
         self.init_time = init_time
         self.cur_time = init_time
@@ -38,7 +64,9 @@ class Simulation:
                f"Current Sessions: {self.get_len_sessions()}\n" \
                f"Current duration: {self.get_duration_str()}\n" \
                f"Current user rate: {self.rate}\n" \
-               f"Quantity of events: {self.qty_events}"
+               f"Quantity of events: {self.qty_events}\n" \
+               f"Users in pool: {len(self.user_pool.pool)}\n" \
+               f"Memory usage: {self.get_memory_usage() / 2 ** 20:.1f} MB"
 
     def get_len_sessions(self) -> int:
         """
@@ -46,6 +74,12 @@ class Simulation:
         """
         return len(self.cur_sessions)
 
+    def get_memory_usage(self) -> int:
+        """
+        Get resident memory of the process in bytes
+        """
+        return get_memory_usage()
+
     def get_duration(self) -> timedelta:
         """
         Get duration of simulation
@@ -73,7 +107,7 @@ class Simulation:
         """
         Calculate rate of events per step
         """
-        hourly_rate = self.config['visits_per_hour'][self.cur_time.hour]
+        hourly_rate = self.samplers.visits_per_hour[self.cur_time.hour]
         return hourly_rate * self.sessions_per_day / self.get_steps_per_hour()
 
     def wait(self) -> None:
@@ -85,30 +119,118 @@ class Simulation:
 
     def create_sessions(self) -> list:
         """
-        Create a new session for a new user
+        Create a new session for a new user.
+        When max_sessions is reached, the admission_policy decides what happens: reject_new drops the new sessions,
+        end_oldest evicts the oldest active sessions to make room. Evicted sessions are cut off silently, they do
+        not go through session_end.
         """
         n_users = int(self.rate)
         n_users += choices([1, 0], cum_weights=[(self.rate % 1), 1])[0]
+        if self.max_sessions is not None:
+            n_free = self.max_sessions - len(self.cur_sessions)
+            if self.admission_policy == 'reject_new':
+                n_admitted = max(0, min(n_users, n_free))
+            else:
+                n_admitted = min(n_users, self.max_sessions)
+                n_evicted = max(0, n_admitted - n_free)
+                del self.cur_sessions[:n_evicted]
+                self.qty_evicted_sessions += n_evicted
+            self.qty_rejected_sessions += n_users - n_admitted
+            n_users = n_admitted
+
         for n in range(n_users):
-            self.cur_sessions.append(Event(self.cur_time, self.user_pool.get_user(), self.batch_size))
+            self.cur_sessions.append(Event(self.cur_time, self.user_pool.get_user(), self.batch_size, self.samplers))
 
         return self.cur_sessions
 
-    def update_all_sessions(self) -> None:
+    def reload_config(self, config: dict = None) -> None:
+        """
+        Compile a new config (or reload the config file if none is given). It is swapped in at the beginning
+        of the next step, so it can be called while iterating over run() or from another thread.
+        Active sessions and the user pool are kept. Raises ValueError if the config is invalid or does not define
+        the page of an active session.
+        """
+        config = config if config is not None else load_config()
+        validate_config(config)
+        samplers = Samplers(config)
+        self.check_sessions(samplers)
+        self.next_samplers = samplers
+
+    def check_sessions(self, samplers: Samplers) -> None:
+        """
+        Check that the samplers define the current page of every active session
+        """
         for session in list(self.cur_sessions):
+            if session.is_active() and session.current_page not in samplers.pages:
+                raise ValueError(f'Config does not define page {session.current_page} of an active session')
+
+    def apply_config(self) -> None:
+        """
+        Swap in the config given to reload_config, or the config file if it changed and watch_config is enabled.
+        An invalid config file is logged and ignored until the file changes again.
+        """
+        if self.watch_config:
+            try:
+                config = load_config()
+                if config is not self.file_config:
+                    self.file_config = config
+                    self.reload_config(config)
+            except ValueError as error:
+                if str(error) != self.config_error:
+                    self.config_error = str(error)
+                    logging.error(f'Keeping current config, the config file is invalid: {error}')
+
+        samplers = self.next_samplers
+        if samplers is not self.samplers:
+            try:
+                # sessions may have landed on pages of the previous config since reload_config was called
+                self.check_sessions(samplers)
+            except ValueError as error:
+                logging.error(f'Keeping current config: {error}')
+                self.next_samplers = self.samplers
+                return
+            self.samplers = samplers
+            self.config = samplers.config
+            self.user_pool.samplers = samplers
+            for session in self.cur_sessions:
+                session.samplers = samplers
+            self.rate = self.get_rate_per_step()
+
+    def update_all_sessions(self) -> None:
+        for session in self.cur_sessions:
             session.update(self.cur_time)
-            if not session.is_active():
-                self.cur_sessions.remove(session)
+        self.cur_sessions[:] = [session for session in self.cur_sessions if session.is_active()]
 
-    def run(self, duration_seconds: int) -> Generator[dict, None, None]:
+    def run(self, duration_seconds: float, until: datetime = None) -> Generator[dict, None, None]:
         """
         Function to run a simulation for the given duration in seconds. Yields events.
+        If until is given, the simulation also stops once the simulated time reaches it.
         """
         start = time()
-        while time() - start < duration_seconds:
+        while time() - start < duration_seconds and (until is None or self.cur_time < until):
+            self.apply_config()
             self.update_all_sessions()
             self.create_sessions()
             self.wait()
             for session in self.cur_sessions:
                 if session.is_new_page:
                     yield session.asdict()
+
+    def run_partitioned(self, duration_seconds: float, partitions: Sequence, key: str = 'user_domain_id',
+                        until: datetime = None) -> None:
+        """
+        Run a simulation for the given duration in seconds, routing each event to one of the partitions.
+        Partitions are chosen by a stable hash of the event field given by key (e.g. user_domain_id, page_url_path),
+        so all events sharing a key go to the same partition, in the order they were generated.
+        Any object with a put() method can be used as a partition, such as queue.Queue or multiprocessing.Queue;
+        bounded queues will apply backpressure to the simulation. When the simulation ends, None is put
+        into every partition to signal consumers to stop, even if the simulation fails or is interrupted.
+        until bounds the simulated time, as in run().
+        """
+        n_partitions = len(partitions)
+        try:
+            for event in self.run(duration_seconds, until=until):
+                partitions[get_partition(event[key], n_partitions)].put(event)
+        finally:
+            for partition in partitions:
+                partition.put(None)
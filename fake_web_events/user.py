@@ -1,8 +1,9 @@
 from faker import Faker
 import json
-from fake_web_events.utils import WeightedRandom
+from fake_web_events.utils import WeightedRandom, Samplers
 import random
 import logging
+from collections import OrderedDict
 
 
 class User(Faker, WeightedRandom):
@@ -10,8 +11,10 @@ class User(Faker, WeightedRandom):
     Class that will create fake event attributes associated to a user
     """
 
-    def __init__(self):
+    def __init__(self, samplers: Samplers = None):
         super().__init__(['en_US'])
+        if samplers is not None:
+            self.samplers = samplers
         self.lat, self.lng, self.region, self.country, self.timezone = self.location_on_land()
         self.os_name = self.select('operating_systems')
         self.browser_name = self.select('browsers')
@@ -148,8 +151,9 @@ class User(Faker, WeightedRandom):
 
 class UserPool:
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, samplers: Samplers = None):
         self.size = size
+        self.samplers = samplers
         self.pool = []
         self.populate_pool()
 
@@ -158,7 +162,7 @@ class UserPool:
         for idx in range(1, self.size + 1):
             if idx % 100 == 0:
                 logging.info(f'{idx} users created.')
-            self.pool.append(User().asdict())
+            self.pool.append(User(self.samplers).asdict())
 
     def __repr__(self) -> str:
         return repr(self.pool)
@@ -168,3 +172,56 @@ class UserPool:
         Get a random user with reposition
         """
         return random.choices(self.pool)[0]
+
+
+class StreamingUserPool:
+    """
+    User pool where new users keep arriving over time and the least recently active users are evicted,
+    so the pool never holds more than size users
+    """
+
+    def __init__(self, size: int, new_user_probability: float = 0.05, samplers: Samplers = None):
+        self.size = size
+        self.new_user_probability = new_user_probability
+        self.samplers = samplers
+        self.pool = []
+        self.positions = OrderedDict()
+        self.qty_created = 0
+        self.qty_evicted = 0
+
+    def __repr__(self) -> str:
+        return repr(self.pool)
+
+    def add_user(self) -> dict:
+        """
+        Create a new user from the current samplers, evicting the least recently active user if the pool is full
+        """
+        user = User(self.samplers).asdict()
+        self.positions[user['user_domain_id']] = len(self.pool)
+        self.pool.append(user)
+        self.qty_created += 1
+        if len(self.pool) > self.size:
+            self.evict_user()
+        return user
+
+    def evict_user(self) -> None:
+        """
+        Remove the least recently active user, moving the last user of the pool to its position
+        """
+        _, position = self.positions.popitem(last=False)
+        last_user = self.pool.pop()
+        if position < len(self.pool):
+            self.pool[position] = last_user
+            self.positions[last_user['user_domain_id']] = position
+        self.qty_evicted += 1
+
+    def get_user(self) -> dict:
+        """
+        Get a new user while the pool is not full yet. Once it is full, get a new user with probability
+        new_user_probability, otherwise a random user from the pool.
+        """
+        if len(self.pool) < self.size or random.random() < self.new_user_probability:
+            return self.add_user()
+        user = random.choices(self.pool)[0]
+        self.positions.move_to_end(user['user_domain_id'])
+        return user
@@ -1,8 +1,10 @@
 import os
-import yaml
 import random
 import sys
 import logging
+import math
+import zlib
+from itertools import accumulate
 
 from typing import Tuple, List
 
@@ -12,22 +14,187 @@ def _get_abs_path(path: str) -> str:
     return os.path.join(__location__, path)
 
 
+_config_cache = {}
+
+
+def _get_config_path() -> str:
+    """
+    Path of the config.yml next to the running script if it exists, otherwise the path of the template
+    """
+    path = os.path.join(sys.path[0], 'config.yml')
+    if os.path.isfile(path):
+        return path
+    return _get_abs_path('config.template.yml')
+
+
 def load_config() -> dict:
     """
-    Load config file. If not found, then load the template
+    Load config file. If not found, then load the template.
+    The parsed config is cached and only parsed again when the file changes (mtime or size), so callers
+    share the same dict and must not modify it.
+    """
+    path = _get_config_path()
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _config_cache.get(path)
+    if cached is None or cached[0] != version:
+        import yaml
+
+        if path == _get_abs_path('config.template.yml'):
+            logging.info('config.yml not found, loading default template.')
+        with open(path, 'r') as f:
+            try:
+                cached = (version, yaml.safe_load(f))
+            except yaml.YAMLError as error:
+                cached = (version, ValueError(f'Could not parse {path}: {error}'))
+        _config_cache[path] = cached
+    if isinstance(cached[1], ValueError):
+        raise cached[1]
+    return cached[1]
+
+
+WEIGHTED_PROPERTIES = ('landing_pages', 'operating_systems', 'utm_sources', 'ads', 'campaigns', 'utm_mediums', 'browsers')
+
+
+def _is_weights(values) -> bool:
+    """
+    Check if a config property is a mapping of values to numeric weights, as opposed to e.g. a description
+    """
+    return isinstance(values, dict) and all(
+        isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in values.values())
+
+
+def validate_config(config: dict) -> None:
+    """
+    Check that a config has every property used by the simulation, with finite non negative weights adding up to
+    more than zero, a visit rate for every hour of the day and only transitions to defined pages.
+    Raises ValueError otherwise.
+    """
+    if not isinstance(config, dict):
+        raise ValueError('Config must be a mapping of properties')
+
+    if not isinstance(config.get('pages'), dict) or not config['pages']:
+        raise ValueError('Config property pages is missing or empty')
+
+    weights = [(name, config.get(name)) for name in ('visits_per_hour',) + WEIGHTED_PROPERTIES]
+    weights += [(f'pages.{page}', next_pages) for page, next_pages in config['pages'].items()]
+    for name, values in weights:
+        if not isinstance(values, dict) or not values:
+            raise ValueError(f'Config property {name} is missing or empty')
+        if not _is_weights(values):
+            raise ValueError(f'Config property {name} has non numeric weights')
+        if not all(math.isfinite(weight) and weight >= 0 for weight in values.values()):
+            raise ValueError(f'Config property {name} has negative or infinite weights')
+        if sum(values.values()) <= 0:
+            raise ValueError(f'Config property {name} must have weights adding up to more than zero')
+
+    missing_hours = set(range(24)) - set(config['visits_per_hour'])
+    if missing_hours:
+        raise ValueError(f'Config property visits_per_hour is missing hours {sorted(missing_hours)}')
+
+    for page, next_pages in config['pages'].items():
+        for next_page in next_pages:
+            if next_page != 'session_end' and next_page not in config['pages']:
+                raise ValueError(f'Page {page} goes to undefined page {next_page}')
+    for page in config['landing_pages']:
+        if page not in config['pages']:
+            raise ValueError(f'Landing page {page} is not defined in pages')
+
+
+class Samplers:
+    """
+    Config compiled into lists of values and cumulative weights, ready to be sampled with random.choices.
+    Top level properties that are not mappings of weights (e.g. a description) are ignored.
+    Instances are never modified after being built, so they can be swapped atomically while a simulation runs.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.visits_per_hour = [config['visits_per_hour'][hour] for hour in range(24)]
+        self.properties = {
+            name: (list(values.keys()), list(accumulate(values.values())))
+            for name, values in config.items() if name != 'pages' and _is_weights(values)
+        }
+        self.pages = {
+            page: (list(next_pages.keys()), list(next_pages.values()), list(accumulate(next_pages.values())))
+            for page, next_pages in config['pages'].items()
+        }
+
+    def select(self, property_name: str) -> str:
+        """
+        Select a weighted random value from a property defined in config file
+        """
+        keys, cum_weights = self.properties[property_name]
+        return random.choices(keys, cum_weights=cum_weights)[0]
+
+    def next_page(self, page: str) -> str:
+        """
+        Select a weighted random page to go to from the given page
+        """
+        pages, _, cum_weights = self.pages[page]
+        return random.choices(pages, cum_weights=cum_weights)[0]
+
+
+class LazyConfig:
+    """
+    Class attribute that loads the config on first access instead of at import time
+    """
+
+    def __init__(self):
+        self.value = None
+
+    def load(self) -> dict:
+        return load_config()
+
+    def __get__(self, instance, owner) -> dict:
+        if self.value is None:
+            self.value = self.load()
+        return self.value
+
+
+class LazySamplers(LazyConfig):
+    """
+    Class attribute that compiles the config into samplers on first access
+    """
+
+    def load(self) -> Samplers:
+        return Samplers(load_config())
+
+
+def get_memory_usage() -> int:
+    """
+    Get the resident memory of the current process in bytes.
+    Falls back to the peak resident memory where /proc is not available, and to 0 where neither is.
     """
     try:
-        with open(os.path.join(sys.path[0], 'config.yml'), 'r') as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        logging.info('config.yml not found, loading default template.')
-        with open(_get_abs_path('config.template.yml'), 'r') as f:
-            return yaml.safe_load(f)
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def get_partition(key: str, n_partitions: int) -> int:
+    """
+    Map a key to a partition index with a stable hash, so the same key always lands on the same partition
+    across runs and processes (unlike the builtin hash(), which is salted per process)
+    :param key: value used to route an event, e.g. the user_domain_id
+    :param n_partitions: total number of partitions
+    :return: partition index between 0 and n_partitions - 1
+    """
+    return zlib.crc32(str(key).encode('utf-8')) % n_partitions
 
 
 class WeightedRandom:
 
-    config = load_config()
+    config = LazyConfig()
+    samplers = LazySamplers()
 
     def select(self, property_name: str) -> str:
         """
@@ -35,14 +202,11 @@ class WeightedRandom:
         :param property_name: a property name defined in config file
         :return:
         """
-        keys = [key for key in self.config.get(property_name).keys()]
-        weights = self.config.get(property_name).values()
-        return random.choices(keys, weights=weights)[0]
+        return self.samplers.select(property_name)
 
     def get_pages(self, page: str) -> Tuple[List[str], List[float]]:
         """
         Returns list of pages and weights from config
         """
-        pages = [page for page in self.config['pages'].get(page).keys()]
-        weights = list(self.config['pages'].get(page).values())
+        pages, weights, _ = self.samplers.pages[page]
         return pages, weights
@@ -18,7 +18,9 @@ setup(
     url="https://github.com/andresionek91/fake-web-events",
     packages=['fake_web_events'],
     install_requires=['pyaml==20.4.0', 'faker==4.1.1'],
+    extras_require={'numpy': ['numpy']},
     include_package_data=True,
+    entry_points={'console_scripts': ['fake-web-events=fake_web_events.cli:main']},
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
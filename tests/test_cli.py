@@ -0,0 +1,92 @@
+from fake_web_events.cli import generate_events, main, parse_args, run_workers
+from fake_web_events.simulation import Simulation
+from fake_web_events.event_log import EventLog
+import pytest
+import gzip
+import json
+import subprocess
+import sys
+
+ARGS = ['--seed', '0', '--user-pool-size', '2', '--start', '2020-07-07T00:00:00', '--end', '2020-07-07T00:10:00']
+
+
+def _read_events(output: bytes) -> list:
+    return [json.loads(line) for line in output.decode('utf-8').splitlines()]
+
+
+class TestCli:
+
+    def test_ndjson_to_stdout(self, capsysbinary):
+        main(ARGS)
+        events = _read_events(capsysbinary.readouterr().out)
+        assert len(events) > 0
+        assert all(event['event_timestamp'] < '2020-07-07 00:10:15' for event in events)
+
+    def test_seed_is_reproducible(self, capsysbinary):
+        main(ARGS)
+        first_output = capsysbinary.readouterr().out
+        main(ARGS)
+        assert capsysbinary.readouterr().out == first_output
+
+    def test_compressed_file(self, capsysbinary, tmp_path):
+        path = str(tmp_path / 'events.json.gz')
+        main(ARGS + ['-o', path, '--compression', 'gzip'])
+        main(ARGS)
+        with gzip.open(path, 'rb') as f:
+            assert f.read() == capsysbinary.readouterr().out
+
+    def test_binary_file(self, capsysbinary, tmp_path):
+        pytest.importorskip('numpy')
+        path = str(tmp_path / 'events.bin')
+        main(ARGS + ['-o', path, '--format', 'binary'])
+        main(ARGS)
+        assert list(EventLog(path)) == _read_events(capsysbinary.readouterr().out)
+
+    def test_workers_to_stdout(self, capsysbinary):
+        main(ARGS + ['--workers', '2'])
+        events = _read_events(capsysbinary.readouterr().out)
+        assert len(set(event['user_domain_id'] for event in events)) == 2
+
+    def test_workers_to_files(self, tmp_path):
+        main(ARGS + ['--workers', '2', '-o', str(tmp_path / 'events-{worker}.json')])
+        for worker in range(2):
+            events = _read_events((tmp_path / f'events-{worker}.json').read_bytes())
+            assert len(set(event['user_domain_id'] for event in events)) == 1
+
+    def test_workers_stop_when_reader_goes_away(self):
+        process = subprocess.Popen([sys.executable, '-m', 'fake_web_events', '--workers', '2', '--user-pool-size', '2',
+                                    '--duration', '300'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for idx in range(3):
+            json.loads(process.stdout.readline())
+        process.stdout.close()
+        assert process.wait(timeout=60) == 1
+
+    @pytest.mark.parametrize('output', ['-', 'events-{worker}.json'])
+    def test_failed_workers(self, tmp_path, output):
+        args = parse_args(ARGS + ['--workers', '2', '-o', output if output == '-' else str(tmp_path / output)])
+        args.admission_policy = 'drop_all'
+        with pytest.raises(RuntimeError):
+            run_workers(args)
+
+    def test_max_sessions_is_split_between_workers(self, monkeypatch):
+        simulations = []
+        monkeypatch.setattr(Simulation, 'run', lambda simulation, *args, **kwargs: simulations.append(simulation))
+        args = parse_args(ARGS + ['--workers', '2', '--max-sessions', '5'])
+        generate_events(args, 0)
+        assert simulations[0].max_sessions == 2
+
+    def test_bench(self, capsysbinary):
+        main(ARGS + ['--bench'])
+        stats = capsysbinary.readouterr().err.decode('utf-8')
+        assert 'Throughput' in stats and 'Memory usage' in stats
+
+    @pytest.mark.parametrize('args', [
+        ['--workers', '0'],
+        ['--max-sessions', '0'],
+        ['--workers', '2', '-o', 'events.json'],
+        ['--workers', '2', '--format', 'binary'],
+        ['--compression', 'zip'],
+    ])
+    def test_invalid_args(self, args):
+        with pytest.raises(SystemExit):
+            parse_args(args)
@@ -1,4 +1,7 @@
-from fake_web_events.utils import load_config
+import copy
+import subprocess
+import sys
+from fake_web_events.utils import Samplers, load_config, validate_config
 import pytest
 
 
@@ -37,3 +40,58 @@ class TestConfig:
         sum_parameter = round(sum(config[parameter].values()), 8)
         if sum_parameter != 1:
             raise SumNotOneException(parameter, sum_parameter)
+
+
+class TestLoadConfig:
+
+    def test_config_is_cached(self):
+        assert load_config() is load_config()
+
+    def test_config_is_reloaded_when_file_changes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'path', [str(tmp_path)] + sys.path[1:])
+        config_file = tmp_path / 'config.yml'
+        config_file.write_text('browsers:\n  Chrome: 1\n')
+        assert load_config() == {'browsers': {'Chrome': 1}}
+        config_file.write_text('browsers:\n  Firefox: 1.0\n')
+        assert load_config() == {'browsers': {'Firefox': 1.0}}
+
+    def test_import_does_not_load_faker(self):
+        code = 'import sys, fake_web_events; assert "faker" not in sys.modules and "yaml" not in sys.modules'
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+
+class TestValidateConfig:
+
+    def test_template_is_valid(self):
+        validate_config(config)
+
+    @pytest.mark.parametrize('change', [
+        lambda c: c.pop('visits_per_hour'),
+        lambda c: c['visits_per_hour'].pop(12),
+        lambda c: c['browsers'].update({'Chrome': 'a lot'}),
+        lambda c: c['pages']['home'].update({'checkout': 0.1}),
+        lambda c: c['landing_pages'].update({'checkout': 0.1}),
+        lambda c: c.update({'pages': {'home': None}}),
+        lambda c: c.update({'landing_pages': {'home': 0}}),
+        lambda c: c['browsers'].update({'Chrome': -1}),
+        lambda c: c['ads'].update({'ad_1': float('nan')}),
+        lambda c: c['pages']['cart'].update({'payment': float('inf')}),
+        lambda c: c['pages'].update({'confirmation': {'confirmation': 0, 'session_end': 0}}),
+    ])
+    def test_invalid_config(self, change):
+        invalid_config = copy.deepcopy(config)
+        change(invalid_config)
+        with pytest.raises(ValueError):
+            validate_config(invalid_config)
+
+    def test_invalid_yaml(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'path', [str(tmp_path)] + sys.path[1:])
+        (tmp_path / 'config.yml').write_text('pages: [home\n')
+        with pytest.raises(ValueError):
+            load_config()
+
+    def test_extra_properties_are_ignored(self):
+        extra_config = {**copy.deepcopy(config), 'description': 'soak test traffic', 'owner': {'team': 'data'}}
+        validate_config(extra_config)
+        samplers = Samplers(extra_config)
+        assert 'description' not in samplers.properties and 'owner' not in samplers.properties
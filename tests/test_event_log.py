@@ -0,0 +1,65 @@
+from fake_web_events.simulation import Simulation
+from fake_web_events.event_log import EventLogWriter, EventLog
+import pytest
+from faker import Faker
+import random
+from datetime import datetime
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture()
+def mock_events():
+    random.seed(0)
+    Faker.seed(0)
+    simulation = Simulation(10, 100000, 10, datetime(2020, 7, 7, 0, 0, 0, 0))
+    return list(simulation.run(1))
+
+
+@pytest.fixture()
+def mock_event_log(mock_events, tmp_path):
+    path = str(tmp_path / 'events.bin')
+    with open(path, 'wb') as f, EventLogWriter(f) as writer:
+        for event in mock_events:
+            writer.write(event)
+    return EventLog(path)
+
+
+class TestEventLog:
+
+    def test_len(self, mock_events, mock_event_log):
+        assert len(mock_event_log) == len(mock_events)
+
+    def test_records_are_memory_mapped(self, mock_event_log):
+        assert isinstance(mock_event_log.records, np.memmap)
+        assert mock_event_log.records.dtype.itemsize == 32
+
+    def test_decode_events(self, mock_events, mock_event_log):
+        assert list(mock_event_log) == mock_events
+
+    def test_getitem(self, mock_events, mock_event_log):
+        assert mock_event_log[-1] == mock_events[-1]
+
+    def test_user_pool_table(self, mock_events, mock_event_log):
+        assert len(mock_event_log.user_values['user_domain_id']) == len(set(e['user_domain_id'] for e in mock_events))
+
+    @pytest.mark.parametrize('field', ['page', 'browser_name', 'os_name', 'utm_source', 'device_type'])
+    def test_codes(self, mock_events, mock_event_log, field):
+        vocabulary = mock_event_log.vocabularies[field]
+        decoded = [vocabulary[code] for code in mock_event_log.codes(field)]
+        if field == 'page':
+            assert [page_url_path for _, page_url_path in decoded] == [e['page_url_path'] for e in mock_events]
+        else:
+            assert decoded == [e[field] for e in mock_events]
+
+    def test_empty_log(self, tmp_path):
+        path = str(tmp_path / 'empty.bin')
+        with open(path, 'wb') as f:
+            EventLogWriter(f).close()
+        assert list(EventLog(path)) == []
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / 'invalid.bin'
+        path.write_bytes(b'{"event_id": "not a binary log"}')
+        with pytest.raises(ValueError):
+            EventLog(str(path))
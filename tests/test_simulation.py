@@ -1,8 +1,13 @@
+import copy
+import sys
+import yaml
 from fake_web_events.simulation import Simulation
+from fake_web_events.utils import get_partition
 import pytest
 from faker import Faker
 import random
 from datetime import datetime, timedelta
+from queue import Queue
 
 
 @pytest.fixture()
@@ -57,4 +62,179 @@ class TestSimulation:
         # after running the simulation for some time, the max unique user ids must be equal to the pool size
         events = list(mock_simulation.run(2))
         user_domain_ids = set(event['user_domain_id'] for event in events)
-        assert len(user_domain_ids) == 10
\ No newline at end of file
+        assert len(user_domain_ids) == 10
+
+
+class TestRunPartitioned:
+
+    def test_events_are_partitioned_by_key(self, mock_simulation):
+        partitions = [Queue() for _ in range(3)]
+        mock_simulation.run_partitioned(1, partitions)
+        for idx, partition in enumerate(partitions):
+            events = list(iter(partition.get, None))
+            assert all(get_partition(event['user_domain_id'], 3) == idx for event in events)
+
+    def test_partitions_are_closed_on_failure(self, mock_simulation, monkeypatch):
+        def failing_run(*args, **kwargs):
+            yield from []
+            raise RuntimeError('simulation failed')
+
+        monkeypatch.setattr(mock_simulation, 'run', failing_run)
+        partitions = [Queue() for _ in range(2)]
+        with pytest.raises(RuntimeError):
+            mock_simulation.run_partitioned(1, partitions)
+        assert all(partition.get_nowait() is None for partition in partitions)
+
+    def test_order_is_kept_per_key(self):
+        until = datetime(2020, 7, 7, 0, 30, 0, 0)
+        random.seed(0)
+        Faker.seed(0)
+        stream = list(Simulation(10, 10000, 10, datetime(2020, 7, 7, 0, 0, 0, 0)).run(60, until=until))
+
+        random.seed(0)
+        Faker.seed(0)
+        partitions = [Queue() for _ in range(2)]
+        Simulation(10, 10000, 10, datetime(2020, 7, 7, 0, 0, 0, 0)).run_partitioned(60, partitions, until=until)
+        partitioned = [list(iter(partition.get, None)) for partition in partitions]
+
+        assert sum(len(events) for events in partitioned) == len(stream) > 0
+        for events in partitioned:
+            for user_id in set(event['user_domain_id'] for event in events):
+                assert [e for e in events if e['user_domain_id'] == user_id] == \
+                       [e for e in stream if e['user_domain_id'] == user_id]
+
+
+@pytest.fixture()
+def new_config(mock_simulation):
+    config = copy.deepcopy(mock_simulation.samplers.config)
+    config['visits_per_hour'] = {hour: 1 / 24 for hour in range(24)}
+    config['landing_pages'] = {'cart': 1}
+    return config
+
+
+class TestReloadConfig:
+
+    def test_config_matches_samplers(self, mock_simulation, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'path', [str(tmp_path)] + sys.path[1:])
+        (tmp_path / 'config.yml').write_text('browsers:\n  Opera: 1\n')
+        assert mock_simulation.config is mock_simulation.samplers.config
+
+    def test_config_is_swapped_at_next_step(self, mock_simulation, mock_create_sessions, new_config):
+        mock_simulation.reload_config(new_config)
+        assert round(mock_simulation.rate, 5) == 0.75833
+        mock_simulation.apply_config()
+        assert round(mock_simulation.rate, 5) == 1.15741
+        assert all(session.samplers is mock_simulation.samplers for session in mock_simulation.cur_sessions)
+
+    def test_sessions_and_pool_are_kept(self, mock_simulation, mock_create_sessions, new_config):
+        sessions = list(mock_simulation.cur_sessions)
+        pool = mock_simulation.user_pool
+        mock_simulation.reload_config(new_config)
+        mock_simulation.apply_config()
+        assert mock_simulation.cur_sessions == sessions
+        assert mock_simulation.user_pool is pool
+
+    def test_new_sessions_use_new_config(self, mock_simulation, new_config):
+        mock_simulation.reload_config(new_config)
+        mock_simulation.apply_config()
+        for idx in range(10):
+            mock_simulation.create_sessions()
+        assert set(session.current_page for session in mock_simulation.cur_sessions) == {'cart'}
+
+    def test_watch_config(self, mock_simulation, new_config, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'path', [str(tmp_path)] + sys.path[1:])
+        mock_simulation.watch_config = True
+        (tmp_path / 'config.yml').write_text(yaml.safe_dump(new_config))
+        mock_simulation.apply_config()
+        assert mock_simulation.samplers.config == new_config
+
+    def test_config_with_description(self, mock_simulation, new_config):
+        new_config['description'] = 'flat traffic'
+        mock_simulation.reload_config(new_config)
+        mock_simulation.apply_config()
+        assert mock_simulation.samplers.config is new_config
+
+    def test_invalid_config_is_rejected(self, mock_simulation, new_config):
+        new_config.pop('visits_per_hour')
+        with pytest.raises(ValueError):
+            mock_simulation.reload_config(new_config)
+
+    def test_config_without_active_page_is_rejected(self, mock_simulation, mock_create_sessions, new_config):
+        mock_simulation.cur_sessions[0].current_page = 'payment'
+        new_config['pages'].pop('payment')
+        new_config['pages']['cart'] = {'cart': 0.5, 'session_end': 0.5}
+        with pytest.raises(ValueError):
+            mock_simulation.reload_config(new_config)
+
+    def test_watch_config_keeps_samplers_on_partial_write(self, mock_simulation, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'path', [str(tmp_path)] + sys.path[1:])
+        mock_simulation.watch_config = True
+        samplers = mock_simulation.samplers
+        for partial_config in ['pages:\n  home:\n', 'pages: [home\n', '']:
+            (tmp_path / 'config.yml').write_text(partial_config)
+            mock_simulation.apply_config()
+            assert mock_simulation.samplers is samplers
+
+
+@pytest.fixture()
+def mock_bounded_simulation(request):
+    random.seed(0)
+    Faker.seed(0)
+    return Simulation(10, 100000, 10, datetime(2020, 7, 7, 0, 0, 0, 0), max_sessions=20,
+                      admission_policy=request.param, new_user_probability=0.5)
+
+
+class TestBoundedSimulation:
+
+    @pytest.mark.parametrize('mock_bounded_simulation', ['reject_new', 'end_oldest'], indirect=True)
+    def test_max_sessions(self, mock_bounded_simulation):
+        for idx in range(100):
+            mock_bounded_simulation.create_sessions()
+            assert mock_bounded_simulation.get_len_sessions() <= 20
+
+    @pytest.mark.parametrize('mock_bounded_simulation', ['reject_new'], indirect=True)
+    def test_reject_new(self, mock_bounded_simulation):
+        mock_bounded_simulation.create_sessions()
+        first_sessions = list(mock_bounded_simulation.cur_sessions)
+        for idx in range(10):
+            mock_bounded_simulation.create_sessions()
+        assert mock_bounded_simulation.cur_sessions[:len(first_sessions)] == first_sessions
+        assert mock_bounded_simulation.qty_rejected_sessions > 0
+
+    @pytest.mark.parametrize('mock_bounded_simulation', ['end_oldest'], indirect=True)
+    def test_end_oldest(self, mock_bounded_simulation):
+        mock_bounded_simulation.create_sessions()
+        first_session = mock_bounded_simulation.cur_sessions[0]
+        for idx in range(10):
+            mock_bounded_simulation.create_sessions()
+        assert first_session not in mock_bounded_simulation.cur_sessions
+        assert mock_bounded_simulation.get_len_sessions() == 20
+        assert mock_bounded_simulation.qty_evicted_sessions > 0
+
+    @pytest.mark.parametrize('mock_bounded_simulation', ['reject_new'], indirect=True)
+    def test_user_pool_is_bounded(self, mock_bounded_simulation):
+        events = list(mock_bounded_simulation.run(1))
+        assert len(set(event['user_domain_id'] for event in events)) > 10
+        assert len(mock_bounded_simulation.user_pool.pool) == 10
+
+    @pytest.mark.parametrize('mock_bounded_simulation', ['reject_new'], indirect=True)
+    def test_new_users_use_new_config(self, mock_bounded_simulation, new_config):
+        new_config['browsers'] = {'Opera': 1.0}
+        mock_bounded_simulation.reload_config(new_config)
+        mock_bounded_simulation.apply_config()
+        mock_bounded_simulation.user_pool.new_user_probability = 1
+        for idx in range(5):
+            assert mock_bounded_simulation.user_pool.get_user()['browser_name'] == 'Opera'
+
+    def test_invalid_admission_policy(self):
+        with pytest.raises(ValueError):
+            Simulation(1, admission_policy='drop_all')
+
+    def test_get_memory_usage(self, mock_simulation):
+        assert mock_simulation.get_memory_usage() > 0
+
+
+def test_run_until(mock_simulation):
+    until = datetime(2020, 7, 7, 0, 10, 0, 0)
+    list(mock_simulation.run(60, until=until))
+    assert until <= mock_simulation.cur_time < until + timedelta(seconds=13)
@@ -1,4 +1,4 @@
-from fake_web_events.user import User, UserPool
+from fake_web_events.user import User, UserPool, StreamingUserPool
 import pytest
 from faker import Faker
 import random
@@ -88,3 +88,43 @@ class TestUserPool:
     def test_pool_size_after_getting_user(self, mock_user_pool):
         mock_user_pool.get_user()
         assert len(mock_user_pool.pool) == 10
+
+
+@pytest.fixture()
+def mock_streaming_user_pool():
+    random.seed(0)
+    Faker.seed(0)
+    return StreamingUserPool(10, new_user_probability=0.5)
+
+
+class TestStreamingUserPool:
+
+    def test_pool_starts_empty(self, mock_streaming_user_pool):
+        assert len(mock_streaming_user_pool.pool) == 0
+
+    def test_pool_is_filled_first(self, mock_streaming_user_pool):
+        users = [mock_streaming_user_pool.get_user() for _ in range(10)]
+        assert len(set(user['user_domain_id'] for user in users)) == 10
+        assert len(mock_streaming_user_pool.pool) == 10
+
+    def test_pool_size_is_bounded(self, mock_streaming_user_pool):
+        for idx in range(100):
+            mock_streaming_user_pool.get_user()
+        assert len(mock_streaming_user_pool.pool) == 10
+        assert mock_streaming_user_pool.qty_created - mock_streaming_user_pool.qty_evicted == 10
+
+    def test_positions_match_pool(self, mock_streaming_user_pool):
+        for idx in range(100):
+            mock_streaming_user_pool.get_user()
+        for user_id, position in mock_streaming_user_pool.positions.items():
+            assert mock_streaming_user_pool.pool[position]['user_domain_id'] == user_id
+
+    def test_least_recently_active_user_is_evicted(self, mock_streaming_user_pool):
+        mock_streaming_user_pool.new_user_probability = 1
+        first_user = mock_streaming_user_pool.get_user()
+        second_user = mock_streaming_user_pool.get_user()
+        mock_streaming_user_pool.size = 2
+        mock_streaming_user_pool.positions.move_to_end(first_user['user_domain_id'])
+        mock_streaming_user_pool.get_user()
+        assert first_user in mock_streaming_user_pool.pool
+        assert second_user not in mock_streaming_user_pool.pool
@@ -1,4 +1,4 @@
-from fake_web_events.utils import WeightedRandom
+from fake_web_events.utils import WeightedRandom, get_partition
 import random
 import pytest
 
@@ -27,3 +27,12 @@ def test_weighted_random_select(property_name, expected):
 ])
 def test_weighted_get_pages(pages, expected):
     assert WeightedRandom().get_pages(pages) == expected
+
+
+@pytest.mark.parametrize('key,n_partitions,expected', [
+    ('d4713d60-c8a7-4639-ab11-67b367a9c378', 4, 0),
+    ('home', 3, 1),
+    ('product_a', 8, 5),
+])
+def test_get_partition(key, n_partitions, expected):
+    assert get_partition(key, n_partitions) == expected